@@ -0,0 +1 @@
+"""Parking availability forecasting: data loading, features, models and API."""
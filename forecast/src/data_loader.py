@@ -1,25 +1,179 @@
 """Data loading utilities for parking forecasting."""
 
+import hashlib
+import os
 import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
+
+# Rows fetched per round-trip when streaming readings out of SQLite
+READ_CHUNKSIZE = 200_000
+
+# Low-cardinality string columns held as pandas categoricals
+CATEGORY_COLUMNS = ("lot_id", "lot_type")
+
+# Applied once to each long-lived connection of a persistent loader: WAL lets
+# reads run alongside the ingestor's writes, and the page cache/mmap stay
+# warm between requests
+PERSISTENT_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Hive-style date partitions (date=YYYY-MM-DD) of the Parquet export
+PARQUET_PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.date32())]), flavor="hive"
+)
+
+
+def compute_occupancy(total, free) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute occupied spaces and occupancy rate from capacity and free spaces.
+
+    Args:
+        total: Lot capacities
+        free: Free spaces aligned with total
+
+    Returns:
+        int32 occupied spaces and float32 occupancy rate in percent (NaN for
+        lots without capacity)
+    """
+    total = np.asarray(total, dtype=np.int32)
+    occupied = total - np.asarray(free, dtype=np.int32)
+
+    rate = np.full(occupied.shape, np.nan, dtype=np.float32)
+    np.divide(occupied, total, out=rate, where=total != 0)
+    rate *= np.float32(100.0)
+
+    return occupied, rate
+
+
+def to_epoch(value) -> int:
+    """Convert an ISO date/datetime (naive values are UTC) to epoch seconds."""
+    return int(pd.Timestamp(value).timestamp())
+
+
+def epoch_days_ago(days: int) -> int:
+    """Epoch seconds of the moment N days before now."""
+    return int(time.time()) - int(days) * 86400
 
 
 class ParkingDataLoader:
     """Load and preprocess parking data from SQLite database."""
 
-    def __init__(self, db_path):
-        """Initialize data loader with database path."""
+    def __init__(self, db_path, persistent: bool = False):
+        """
+        Initialize data loader with database path.
+
+        Args:
+            db_path: Path to the SQLite database
+            persistent: Keep one tuned connection open per thread instead of
+                connecting per call (for long-running processes)
+        """
         self.db_path = Path(db_path)
         if not self.db_path.exists():
             raise FileNotFoundError(f"Database not found at {self.db_path}")
 
+        self.persistent = persistent
+        self._local = threading.local()
+
+    @contextmanager
+    def _connect(self):
+        """Yield this thread's persistent connection, or a short-lived one."""
+        if not self.persistent:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        # One connection per thread, so concurrent queries never wait on
+        # each other
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            for pragma in PERSISTENT_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        yield conn
+
     def load_parking_lots(self) -> pd.DataFrame:
         """Load parking lot metadata."""
-        conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query("SELECT * FROM parking_lots", conn)
-        conn.close()
+        with self._connect() as conn:
+            df = pd.read_sql_query("SELECT * FROM parking_lots", conn)
+
+        # Same representation as readings.lot_id; align the categories with
+        # align_lot_categories before merging the two
+        df["id"] = df["id"].astype("category")
+
+        return df
+
+    @staticmethod
+    def align_lot_categories(
+        readings: pd.DataFrame, lots: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Give lots.id the categorical dtype of readings.lot_id.
+
+        Merging on categoricals with identical categories joins on the
+        integer codes; differing categories would fall back to object keys.
+
+        Args:
+            readings: DataFrame with a categorical lot_id column
+            lots: Parking lot metadata from load_parking_lots
+
+        Returns:
+            Lots DataFrame with a matching id dtype
+        """
+        return lots.astype({"id": readings["lot_id"].dtype})
+
+    def _read_readings(
+        self, query: str, params: Optional[list] = None
+    ) -> pd.DataFrame:
+        """
+        Stream a readings query in chunks and shrink column dtypes.
+
+        Args:
+            query: SQL query selecting from parking_readings
+            params: Query parameters
+
+        Returns:
+            DataFrame with parsed timestamps and compact dtypes
+        """
+        chunks = []
+        with self._connect() as conn:
+            for chunk in pd.read_sql_query(
+                query,
+                conn,
+                params=params,
+                parse_dates=["timestamp"],
+                chunksize=READ_CHUNKSIZE,
+            ):
+                chunk["free"] = chunk["free"].astype("int32")
+                chunks.append(chunk)
+
+        df = pd.concat(chunks, ignore_index=True)
+
+        # Empty results come back untyped
+        if not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+
         return df
 
     def load_readings(
@@ -27,6 +181,7 @@ class ParkingDataLoader:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         lot_ids: Optional[list] = None,
+        last_n_days: Optional[int] = None,
     ) -> pd.DataFrame:
         """
         Load parking readings with optional filtering.
@@ -35,6 +190,7 @@ class ParkingDataLoader:
             start_date: Filter readings after this date (ISO format)
             end_date: Filter readings before this date (ISO format)
             lot_ids: Filter readings for specific lot IDs
+            last_n_days: Only load readings from the last N days
 
         Returns:
             DataFrame with parking readings
@@ -42,13 +198,18 @@ class ParkingDataLoader:
         query = "SELECT * FROM parking_readings WHERE 1=1"
         params = []
 
+        # Range filters use the indexed integer timestamp_epoch column
         if start_date:
-            query += " AND timestamp >= ?"
-            params.append(start_date)
+            query += " AND timestamp_epoch >= ?"
+            params.append(to_epoch(start_date))
 
         if end_date:
-            query += " AND timestamp <= ?"
-            params.append(end_date)
+            query += " AND timestamp_epoch <= ?"
+            params.append(to_epoch(end_date))
+
+        if last_n_days:
+            query += " AND timestamp_epoch >= ?"
+            params.append(epoch_days_ago(last_n_days))
 
         if lot_ids:
             placeholders = ",".join("?" * len(lot_ids))
@@ -57,38 +218,275 @@ class ParkingDataLoader:
 
         query += " ORDER BY timestamp"
 
-        conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
+        return self._read_readings(query, params)
 
-        # Convert timestamp to datetime
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
+    def load_latest_readings(self, lot_ids: Optional[list] = None) -> pd.DataFrame:
+        """
+        Load the most recent reading of each parking lot.
 
-        return df
+        Args:
+            lot_ids: Filter readings for specific lot IDs
 
-    def load_combined_data(self) -> pd.DataFrame:
+        Returns:
+            DataFrame with one reading per lot, ordered by timestamp
+        """
+        # The per-lot MAX is answered from the (lot_id, timestamp) index
+        where = ""
+        params = []
+        if lot_ids:
+            placeholders = ",".join("?" * len(lot_ids))
+            where = f"WHERE lot_id IN ({placeholders})"
+            params.extend(lot_ids)
+
+        query = f"""
+            SELECT r.*
+            FROM parking_readings r
+            JOIN (
+                SELECT lot_id, MAX(timestamp) AS ts
+                FROM parking_readings
+                {where}
+                GROUP BY lot_id
+            ) m ON r.lot_id = m.lot_id AND r.timestamp = m.ts
+            ORDER BY r.timestamp
+        """
+
+        return self._read_readings(query, params)
+
+    def load_last_n_readings(self, lot_id: str, n: int = 4) -> pd.DataFrame:
+        """
+        Load the N most recent readings of one parking lot.
+
+        Args:
+            lot_id: Parking lot identifier
+            n: Number of readings
+
+        Returns:
+            DataFrame with up to N readings, ordered by timestamp
+        """
+        # Served backwards from the (lot_id, timestamp) index
+        query = """
+            SELECT * FROM (
+                SELECT * FROM parking_readings
+                WHERE lot_id = ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            )
+            ORDER BY timestamp
+        """
+
+        return self._read_readings(query, [lot_id, n])
+
+    def load_combined_data(
+        self, last_n_days: Optional[int] = None, after_id: Optional[int] = None
+    ) -> pd.DataFrame:
         """
         Load readings merged with parking lot metadata.
 
+        Args:
+            last_n_days: Only load readings from the last N days
+            after_id: Only load readings with a larger row id (appended since)
+
         Returns:
             DataFrame with readings and lot information
         """
-        lots = self.load_parking_lots()
-        readings = self.load_readings()
+        # Join inside SQLite so readings are scanned once and only the lot
+        # columns we need are materialized
+        query = """
+            SELECT r.*, l.name, l.total, l.lot_type, l.latitude, l.longitude
+            FROM parking_readings r
+            JOIN parking_lots l ON r.lot_id = l.id
+        """
+        conditions = []
+        params = []
 
-        merged = readings.merge(
-            lots[["id", "name", "total", "lot_type", "latitude", "longitude"]],
-            left_on="lot_id",
-            right_on="id",
-            suffixes=("", "_lot"),
-        )
+        if last_n_days:
+            conditions.append("r.timestamp_epoch >= ?")
+            params.append(epoch_days_ago(last_n_days))
+
+        if after_id is not None:
+            conditions.append("r.id > ?")
+            params.append(after_id)
+
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        query += " ORDER BY r.timestamp"
+
+        merged = self._read_readings(query, params)
 
         # Calculate derived features
-        merged["occupied"] = merged["total"] - merged["free"]
-        merged["occupancy_rate"] = (merged["occupied"] / merged["total"]) * 100
+        occupied, rate = compute_occupancy(merged["total"], merged["free"])
+        merged = merged.assign(occupied=occupied, occupancy_rate=rate)
 
         return merged
 
+    def _lots_version(self) -> str:
+        """Short digest of the lot columns joined into the combined data."""
+        # updated_at is bumped on every ingestor poll, so hash the joined
+        # columns themselves rather than the modification time
+        with self._connect() as conn:
+            lots = conn.execute(
+                "SELECT id, name, total, lot_type, latitude, longitude "
+                "FROM parking_lots ORDER BY id"
+            ).fetchall()
+
+        return hashlib.sha1(repr(lots).encode()).hexdigest()[:16]
+
+    def load_combined_data_cached(self, cache_dir=None) -> pd.DataFrame:
+        """
+        Load combined data through an append-only Parquet cache.
+
+        The cache file is named after the lot metadata digest and the max row
+        id and row count of parking_readings it was built from. Readings are
+        append-only, so when only new rows arrived just those are queried
+        and appended; lot changes or deleted readings trigger a full rebuild.
+
+        Args:
+            cache_dir: Cache directory (defaults to cache/ next to the database)
+
+        Returns:
+            DataFrame with readings and lot information
+        """
+        cache_dir = Path(cache_dir) if cache_dir else self.db_path.parent / "cache"
+        prefix = f"combined_{self._lots_version()}"
+
+        with self._connect() as conn:
+            max_id, count = conn.execute(
+                "SELECT COALESCE(MAX(id), 0), COUNT(*) FROM parking_readings"
+            ).fetchone()
+
+        cache_path = cache_dir / f"{prefix}_{max_id}_{count}.parquet"
+        if cache_path.exists():
+            return pd.read_parquet(cache_path, engine="pyarrow")
+
+        df = None
+        for previous in cache_dir.glob(f"{prefix}_*.parquet"):
+            cached_max_id, cached_count = map(int, previous.stem.split("_")[-2:])
+            with self._connect() as conn:
+                (new_rows,) = conn.execute(
+                    "SELECT COUNT(*) FROM parking_readings WHERE id > ?",
+                    (cached_max_id,),
+                ).fetchone()
+            if cached_count + new_rows != count:
+                continue
+
+            try:
+                cached = pd.read_parquet(previous, engine="pyarrow")
+            except FileNotFoundError:
+                # Removed by a concurrent stale-file cleanup; rebuild instead
+                break
+            new = self.load_combined_data(after_id=cached_max_id)
+            df = pd.concat([cached, new], ignore_index=True)
+            # Late readings of one lot may predate another lot's latest
+            df = df.sort_values("timestamp", kind="stable", ignore_index=True)
+            # Concatenating categoricals with different categories yields
+            # object columns
+            df = df.astype({col: "category" for col in CATEGORY_COLUMNS})
+            break
+
+        if df is None:
+            df = self.load_combined_data()
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob("combined_*.parquet"):
+            stale.unlink(missing_ok=True)
+
+        # Write under a unique temporary name so concurrent readers never see
+        # a partial file and concurrent writers (server refresh, training) of
+        # the same key never share one
+        fd, tmp_name = tempfile.mkstemp(
+            dir=cache_dir, prefix=f"{cache_path.stem}.", suffix=".tmp"
+        )
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        try:
+            df.to_parquet(tmp_path, compression="zstd", engine="pyarrow", index=False)
+            tmp_path.replace(cache_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        return df
+
+    def export_parquet(self, out_dir) -> Path:
+        """
+        Export combined data to a Parquet dataset partitioned by date.
+
+        Existing partitions for the exported dates are replaced.
+
+        Args:
+            out_dir: Directory of the dataset
+
+        Returns:
+            Path of the dataset directory
+        """
+        out_dir = Path(out_dir)
+        df = self.load_combined_data()
+
+        df = df.astype(
+            {
+                "total": "int32",
+                "free": "int32",
+                "occupied": "int32",
+                "occupancy_rate": "float32",
+            }
+        )
+        df["date"] = df["timestamp"].dt.date
+
+        # lot_id is categorical, so Arrow stores it dictionary-encoded
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        ds.write_dataset(
+            table,
+            out_dir,
+            format="parquet",
+            partitioning=PARQUET_PARTITIONING,
+            existing_data_behavior="delete_matching",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression="zstd"
+            ),
+        )
+
+        return out_dir
+
+    @staticmethod
+    def load_parquet(
+        data_dir,
+        lot_ids: Optional[list] = None,
+        last_n_days: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Load combined data from a dataset written by export_parquet.
+
+        Args:
+            data_dir: Directory of the dataset
+            lot_ids: Filter readings for specific lot IDs
+            last_n_days: Only load partitions from the last N days
+
+        Returns:
+            DataFrame with readings and lot information
+        """
+        dataset = ds.dataset(
+            data_dir, format="parquet", partitioning=PARQUET_PARTITIONING
+        )
+
+        filters = []
+        if last_n_days:
+            since = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=last_n_days)).date()
+            filters.append(ds.field("date") >= pa.scalar(since, pa.date32()))
+        if lot_ids:
+            filters.append(ds.field("lot_id").isin(lot_ids))
+
+        expression = None
+        for f in filters:
+            expression = f if expression is None else expression & f
+
+        df = dataset.to_table(filter=expression).to_pandas(self_destruct=True)
+        df = df.drop(columns="date").sort_values(
+            "timestamp", kind="stable", ignore_index=True
+        )
+
+        return df
+
     def get_time_series(self, lot_id: str) -> pd.DataFrame:
         """
         Get time series data for a specific parking lot.
@@ -0,0 +1,36 @@
+"""Export script writing parking data to a date-partitioned Parquet dataset."""
+
+from pathlib import Path
+
+from .data_loader import ParkingDataLoader
+
+
+def export_data(out_dir: str = None):
+    """
+    Export readings joined with lot metadata for fast loading in predict.py.
+
+    Args:
+        out_dir: Output directory (defaults to data/parquet next to the database)
+    """
+    data_dir = Path(__file__).parent.parent.parent / "data"
+
+    if out_dir is None:
+        out_dir = data_dir / "parquet"
+
+    print(f"Exporting {data_dir / 'parking.db'} to {out_dir}...")
+    loader = ParkingDataLoader(data_dir / "parking.db")
+    loader.export_parquet(out_dir)
+    print("Export complete")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export parking data to Parquet")
+    parser.add_argument(
+        "--out", type=str, default=None, help="Output dataset directory"
+    )
+
+    args = parser.parse_args()
+
+    export_data(out_dir=args.out)
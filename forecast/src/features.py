@@ -1,13 +1,218 @@
 """Feature engineering for parking forecasting models."""
 
+import threading
+import numba
 import pandas as pd
 import numpy as np
-from typing import List, Optional
+from numba import njit, prange
+from typing import Dict, List, Optional, Tuple
+
+# Angular step per unit for cyclical encodings
+TWO_PI_OVER_24 = 2 * np.pi / 24
+TWO_PI_OVER_7 = 2 * np.pi / 7
+TWO_PI_OVER_12 = 2 * np.pi / 12
+
+# Parallel kernels are launched from API worker threads. Under the TBB
+# threading layer that makes the process hang at interpreter exit, so pick
+# OpenMP when available and fall back to workqueue (always available, so TBB
+# is never selected)
+numba.config.THREADING_LAYER = "default"
+numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
+# The workqueue layer cannot run parallel kernels launched from several
+# threads at once, so launches are serialized
+_KERNEL_LOCK = threading.Lock()
+
+
+@njit(cache=True)
+def _group_starts(group_ids):
+    """
+    Start offsets of each run of equal group codes, plus the array length.
+
+    Args:
+        group_ids: int64 group codes, sorted so that each group is contiguous
+
+    Returns:
+        int64 array of length n_groups + 1
+    """
+    n = group_ids.shape[0]
+    boundaries = np.flatnonzero(group_ids[1:] != group_ids[:-1]) + 1
+    starts = np.empty(boundaries.shape[0] + 2, dtype=np.int64)
+    starts[0] = 0
+    starts[1:-1] = boundaries
+    starts[-1] = n
+    return starts
+
+
+@njit(parallel=True, cache=True)
+def _group_lags(values, group_ids, order, lags):
+    """
+    Lagged values within each group, written back in the original row order.
+
+    Mirrors ``groupby().shift(lag)``: the first ``lag`` rows of every group
+    are NaN. Groups are processed in parallel threads.
+
+    Args:
+        values: float64 array, sorted so that each group is contiguous
+        group_ids: int64 group codes aligned with values
+        order: Original row position of each sorted value
+        lags: int64 array of lag periods
+
+    Returns:
+        Array of shape (len(lags), n), one row per lag
+    """
+    out = np.empty((lags.shape[0], values.shape[0]))
+    starts = _group_starts(group_ids)
+
+    for g in prange(starts.shape[0] - 1):
+        start = starts[g]
+        end = starts[g + 1]
+        for k in range(lags.shape[0]):
+            lag = lags[k]
+            for i in range(start, end):
+                out[k, order[i]] = values[i - lag] if i - lag >= start else np.nan
+
+    return out
+
+
+@njit(parallel=True, cache=True)
+def _rolling_all_stats(values, group_ids, window):
+    """
+    Rolling mean, std, max and min over group-contiguous values in one pass.
+
+    Mirrors ``Series.rolling(window, min_periods=1)`` per group: NaNs are
+    skipped and std uses ddof=1. Groups are independent, so they are
+    processed in parallel threads. Mean/variance are updated incrementally
+    (Welford add/remove) and min/max are tracked with monotonic deques of
+    window positions.
+
+    Args:
+        values: float64 array, sorted so that each group is contiguous
+        group_ids: int64 group codes aligned with values
+        window: Window size in rows
+
+    Returns:
+        Tuple of (mean, std, max, min) arrays
+    """
+    n = values.shape[0]
+    out_mean = np.empty(n)
+    out_std = np.empty(n)
+    out_max = np.empty(n)
+    out_min = np.empty(n)
+    # Each group only touches its own [start, end) slice of the deques
+    max_deque = np.empty(n, dtype=np.int64)
+    min_deque = np.empty(n, dtype=np.int64)
+
+    starts = _group_starts(group_ids)
+
+    for g in prange(starts.shape[0] - 1):
+        start = starts[g]
+        end = starts[g + 1]
+        nobs = 0
+        mean = 0.0
+        ssqdm = 0.0
+        max_head = max_tail = min_head = min_tail = start
+
+        for i in range(start, end):
+            # Drop the value leaving the window
+            old = i - window
+            if old >= start:
+                x = values[old]
+                if not np.isnan(x):
+                    nobs -= 1
+                    if nobs > 0:
+                        delta = x - mean
+                        mean -= delta / nobs
+                        ssqdm -= delta * (x - mean)
+                    else:
+                        mean = 0.0
+                        ssqdm = 0.0
+            lo = max(start, i - window + 1)
+            while max_head < max_tail and max_deque[max_head] < lo:
+                max_head += 1
+            while min_head < min_tail and min_deque[min_head] < lo:
+                min_head += 1
+
+            # Add the value entering the window
+            x = values[i]
+            if not np.isnan(x):
+                nobs += 1
+                delta = x - mean
+                mean += delta / nobs
+                ssqdm += delta * (x - mean)
+                while max_head < max_tail and values[max_deque[max_tail - 1]] <= x:
+                    max_tail -= 1
+                max_deque[max_tail] = i
+                max_tail += 1
+                while min_head < min_tail and values[min_deque[min_tail - 1]] >= x:
+                    min_tail -= 1
+                min_deque[min_tail] = i
+                min_tail += 1
+
+            if nobs == 0:
+                out_mean[i] = np.nan
+                out_std[i] = np.nan
+                out_max[i] = np.nan
+                out_min[i] = np.nan
+            else:
+                out_mean[i] = mean
+                out_std[i] = (
+                    np.sqrt(max(ssqdm, 0.0) / (nobs - 1)) if nobs > 1 else np.nan
+                )
+                out_max[i] = values[max_deque[max_head]]
+                out_min[i] = values[min_deque[min_head]]
+
+    return out_mean, out_std, out_max, out_min
 
 
 class FeatureEngineer:
     """Create features for parking availability forecasting."""
 
+    @staticmethod
+    def _group_order(
+        df: pd.DataFrame, group_col: Optional[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute a row order that makes each group contiguous.
+
+        The sort is stable, so rows keep their original order within a group.
+
+        Args:
+            df: Input DataFrame
+            group_col: Optional column to group by
+
+        Returns:
+            Positional sort order and the group codes in that order
+        """
+        if group_col:
+            group_ids = df[group_col].factorize()[0].astype(np.int64)
+        else:
+            group_ids = np.zeros(len(df), dtype=np.int64)
+
+        order = np.argsort(group_ids, kind="stable")
+        return order, group_ids[order]
+
+    @staticmethod
+    def _assign_columns(
+        df: pd.DataFrame, new_cols: Dict[str, np.ndarray]
+    ) -> pd.DataFrame:
+        """
+        Append several columns in one concat instead of per-column inserts.
+
+        Existing columns with the same names are replaced.
+
+        Args:
+            df: DataFrame to extend
+            new_cols: Mapping of column name to values aligned with df
+
+        Returns:
+            New DataFrame with the additional columns
+        """
+        existing = [col for col in new_cols if col in df.columns]
+        if existing:
+            df = df.drop(columns=existing)
+        return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
+
     @staticmethod
     def add_temporal_features(
         df: pd.DataFrame, timestamp_col: str = "timestamp"
@@ -22,37 +227,52 @@ class FeatureEngineer:
         Returns:
             DataFrame with additional temporal features
         """
-        df = df.copy()
-
         # Ensure timestamp is datetime
         if not pd.api.types.is_datetime64_any_dtype(df[timestamp_col]):
-            df[timestamp_col] = pd.to_datetime(df[timestamp_col])
+            df = df.assign(**{timestamp_col: pd.to_datetime(df[timestamp_col])})
+
+        # Read the timestamps once; tz-aware values are reduced to wall-clock
+        # time so results match the .dt accessors
+        index = pd.DatetimeIndex(df[timestamp_col])
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        seconds = index.values.astype("datetime64[s]").astype(np.int64)
+        days = seconds // 86400
 
         # Extract temporal components
-        df["hour"] = df[timestamp_col].dt.hour
-        df["day_of_week"] = df[timestamp_col].dt.dayofweek
-        df["day_of_month"] = df[timestamp_col].dt.day
-        df["month"] = df[timestamp_col].dt.month
-        df["year"] = df[timestamp_col].dt.year
-        df["week_of_year"] = df[timestamp_col].dt.isocalendar().week
+        hour = (seconds // 3600) % 24
+        day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday (Monday=0)
+        month = index.month.to_numpy()
+
+        new_cols = {
+            "hour": hour,
+            "day_of_week": day_of_week,
+            "day_of_month": index.day.to_numpy(),
+            "month": month,
+            "year": index.year.to_numpy(),
+            "week_of_year": index.isocalendar().week.array,
+        }
 
         # Cyclical encoding for periodic features
-        df["hour_sin"] = np.sin(2 * np.pi * df["hour"] / 24)
-        df["hour_cos"] = np.cos(2 * np.pi * df["hour"] / 24)
-        df["day_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
-        df["day_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
-        df["month_sin"] = np.sin(2 * np.pi * df["month"] / 12)
-        df["month_cos"] = np.cos(2 * np.pi * df["month"] / 12)
-
-        # Boolean features
-        df["is_weekend"] = df["day_of_week"].isin([5, 6]).astype(int)
-        df["is_business_hours"] = ((df["hour"] >= 8) & (df["hour"] <= 18)).astype(int)
-        df["is_rush_hour"] = (
-            ((df["hour"] >= 7) & (df["hour"] <= 9))
-            | ((df["hour"] >= 16) & (df["hour"] <= 19))
-        ).astype(int)
+        for name, values, scale in (
+            ("hour", hour, TWO_PI_OVER_24),
+            ("day", day_of_week, TWO_PI_OVER_7),
+            ("month", month, TWO_PI_OVER_12),
+        ):
+            angle = values * scale
+            new_cols[f"{name}_sin"] = np.sin(angle)
+            new_cols[f"{name}_cos"] = np.cos(angle, out=angle)
 
-        return df
+        # Boolean features as uint8; range checks use unsigned wrap-around,
+        # e.g. 8 <= hour <= 18 becomes (hour - 8) < 11
+        hour_u8 = hour.astype(np.uint8)
+        new_cols["is_weekend"] = (day_of_week.astype(np.uint8) >= 5).view(np.uint8)
+        new_cols["is_business_hours"] = ((hour_u8 - np.uint8(8)) < 11).view(np.uint8)
+        new_cols["is_rush_hour"] = (
+            ((hour_u8 - np.uint8(7)) < 3) | ((hour_u8 - np.uint8(16)) < 4)
+        ).view(np.uint8)
+
+        return FeatureEngineer._assign_columns(df, new_cols)
 
     @staticmethod
     def add_lag_features(
@@ -73,16 +293,16 @@ class FeatureEngineer:
         Returns:
             DataFrame with lag features
         """
-        df = df.copy()
+        order, sorted_groups = FeatureEngineer._group_order(df, group_col)
+        sorted_values = df[target_col].to_numpy(np.float64)[order]
 
-        for lag in lags:
-            col_name = f"{target_col}_lag_{lag}"
-            if group_col:
-                df[col_name] = df.groupby(group_col)[target_col].shift(lag)
-            else:
-                df[col_name] = df[target_col].shift(lag)
+        with _KERNEL_LOCK:
+            lagged = _group_lags(
+                sorted_values, sorted_groups, order, np.asarray(lags, dtype=np.int64)
+            )
+        new_cols = {f"{target_col}_lag_{lag}": lagged[k] for k, lag in enumerate(lags)}
 
-        return df
+        return FeatureEngineer._assign_columns(df, new_cols)
 
     @staticmethod
     def add_rolling_features(
@@ -103,38 +323,19 @@ class FeatureEngineer:
         Returns:
             DataFrame with rolling features
         """
-        df = df.copy()
+        order, sorted_groups = FeatureEngineer._group_order(df, group_col)
+        sorted_values = df[target_col].to_numpy(np.float64)[order]
 
+        new_cols = {}
         for window in windows:
-            if group_col:
-                grouped = df.groupby(group_col)[target_col]
-                df[f"{target_col}_rolling_mean_{window}"] = grouped.transform(
-                    lambda x: x.rolling(window, min_periods=1).mean()
-                )
-                df[f"{target_col}_rolling_std_{window}"] = grouped.transform(
-                    lambda x: x.rolling(window, min_periods=1).std()
-                )
-                df[f"{target_col}_rolling_max_{window}"] = grouped.transform(
-                    lambda x: x.rolling(window, min_periods=1).max()
-                )
-                df[f"{target_col}_rolling_min_{window}"] = grouped.transform(
-                    lambda x: x.rolling(window, min_periods=1).min()
-                )
-            else:
-                df[f"{target_col}_rolling_mean_{window}"] = (
-                    df[target_col].rolling(window, min_periods=1).mean()
-                )
-                df[f"{target_col}_rolling_std_{window}"] = (
-                    df[target_col].rolling(window, min_periods=1).std()
-                )
-                df[f"{target_col}_rolling_max_{window}"] = (
-                    df[target_col].rolling(window, min_periods=1).max()
-                )
-                df[f"{target_col}_rolling_min_{window}"] = (
-                    df[target_col].rolling(window, min_periods=1).min()
-                )
+            with _KERNEL_LOCK:
+                stats = _rolling_all_stats(sorted_values, sorted_groups, window)
+            for name, sorted_stat in zip(("mean", "std", "max", "min"), stats):
+                stat = np.empty_like(sorted_stat)
+                stat[order] = sorted_stat
+                new_cols[f"{target_col}_rolling_{name}_{window}"] = stat
 
-        return df
+        return FeatureEngineer._assign_columns(df, new_cols)
 
     @staticmethod
     def create_all_features(
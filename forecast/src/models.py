@@ -1,16 +1,45 @@
 """Machine learning models for parking availability forecasting."""
 
+import json
 import numpy as np
 import pandas as pd
-from typing import Dict, Tuple, List
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
+from typing import Dict, Tuple, List, Optional
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import xgboost as xgb
 import lightgbm as lgb
 import joblib
 from pathlib import Path
 
+# File format per model type; XGBoost/LightGBM use their native formats
+MODEL_FILE_SUFFIXES = {
+    "xgboost": ".ubj",
+    "lightgbm": ".txt",
+    "hist_gbm": ".pkl",
+}
+
+# Suffix of the joblib bundles (model plus metadata) saved before the native
+# formats were introduced
+LEGACY_MODEL_SUFFIX = ".pkl"
+
+
+def find_model_file(filepath) -> Path:
+    """
+    Locate a saved model, falling back to a legacy joblib bundle.
+
+    Args:
+        filepath: Expected path of the model in its native format
+
+    Returns:
+        filepath if it exists, else an existing legacy .pkl bundle with the
+        same name, else filepath
+    """
+    model_path = Path(filepath)
+    legacy_path = model_path.with_suffix(LEGACY_MODEL_SUFFIX)
+    if not model_path.exists() and legacy_path.exists():
+        return legacy_path
+    return model_path
+
 
 class ParkingForecaster:
     """Forecasting model for parking availability."""
@@ -20,7 +49,7 @@ class ParkingForecaster:
         Initialize forecaster.
 
         Args:
-            model_type: Type of model ('random_forest', 'xgboost', 'lightgbm')
+            model_type: Type of model ('hist_gbm', 'xgboost', 'lightgbm')
         """
         self.model_type = model_type
         self.model = None
@@ -31,18 +60,18 @@ class ParkingForecaster:
 
     def _init_model(self):
         """Initialize the ML model based on type."""
-        if self.model_type == "random_forest":
-            self.model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=20,
-                min_samples_split=5,
-                min_samples_leaf=2,
+        if self.model_type == "hist_gbm":
+            self.model = HistGradientBoostingRegressor(
+                max_iter=200,
+                max_depth=8,
+                learning_rate=0.1,
+                early_stopping=True,
                 random_state=42,
-                n_jobs=-1,
             )
         elif self.model_type == "xgboost":
             self.model = xgb.XGBRegressor(
                 n_estimators=100,
+                tree_method="hist",
                 max_depth=6,
                 learning_rate=0.1,
                 subsample=0.8,
@@ -59,6 +88,7 @@ class ParkingForecaster:
                 colsample_bytree=0.8,
                 random_state=42,
                 n_jobs=-1,
+                verbose=-1,
             )
         else:
             raise ValueError(f"Unknown model type: {self.model_type}")
@@ -86,6 +116,7 @@ class ParkingForecaster:
                 "lot_id",
                 "city",
                 "timestamp",
+                "timestamp_epoch",
                 "name",
                 "address",
                 "region",
@@ -104,23 +135,30 @@ class ParkingForecaster:
         # Select feature columns
         feature_cols = [col for col in df.columns if col not in exclude_cols]
 
-        # Remove rows with missing target
-        df_clean = df[df[target_col].notna()].copy()
-
-        # Fill missing feature values
-        X = df_clean[feature_cols].fillna(0)
-        y = df_clean[target_col]
-        
-        # Ensure all columns are numeric
-        for col in X.columns:
-            if X[col].dtype == 'object':
-                # Try to convert to numeric, drop if it fails
-                try:
-                    X[col] = pd.to_numeric(X[col])
-                except (ValueError, TypeError):
-                    X = X.drop(columns=[col])
-
-        self.feature_columns = feature_cols
+        # Remove rows with missing target (NaN != NaN)
+        target = df[target_col].to_numpy()
+        mask = target == target
+        X = df.loc[mask, feature_cols]
+        y = df.loc[mask, target_col]
+
+        # Ensure all columns are numeric: coerce object columns and drop the
+        # ones with no numeric values at all
+        obj_cols = X.select_dtypes(include="object").columns
+        if len(obj_cols):
+            coerced = X[obj_cols].apply(pd.to_numeric, errors="coerce")
+            coerced = coerced.dropna(axis=1, how="all")
+            X = X.drop(columns=obj_cols).assign(**coerced.to_dict("series"))
+
+        # Cast to float32 and fill missing values in a single pass; float32
+        # halves the matrix and hist_gbm handles NaN natively
+        na_value = np.nan if self.model_type == "hist_gbm" else 0.0
+        X = pd.DataFrame(
+            X.to_numpy(dtype=np.float32, na_value=na_value),
+            columns=X.columns,
+            index=X.index,
+        )
+
+        self.feature_columns = list(X.columns)
         self.target_column = target_col
 
         return X, y
@@ -147,10 +185,14 @@ class ParkingForecaster:
         print(f"Training {self.model_type} model...")
 
         if X_val is not None and y_val is not None:
-            if self.model_type in ["xgboost", "lightgbm"]:
+            # With tree_method="hist" XGBoost builds a QuantileDMatrix for the
+            # training data and reuses its bins (ref=) for the eval set
+            if self.model_type == "xgboost":
                 self.model.fit(
                     X_train, y_train, eval_set=[(X_val, y_val)], verbose=False
                 )
+            elif self.model_type == "lightgbm":
+                self.model.fit(X_train, y_train, eval_set=[(X_val, y_val)])
             else:
                 self.model.fit(X_train, y_train)
         else:
@@ -176,6 +218,23 @@ class ParkingForecaster:
 
         return metrics
 
+    def feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Extract the model's features as a contiguous float32 array.
+
+        The boosters predict on float32 internally, so this skips their own
+        DataFrame conversion. Missing values are filled with 0.
+
+        Args:
+            df: DataFrame containing the feature columns
+
+        Returns:
+            C-contiguous float32 array of shape (rows, features)
+        """
+        return np.ascontiguousarray(
+            df[self.feature_columns].to_numpy(dtype=np.float32, na_value=0.0)
+        )
+
     def predict(self, X: pd.DataFrame) -> np.ndarray:
         """
         Make predictions.
@@ -191,6 +250,26 @@ class ParkingForecaster:
 
         return self.model.predict(X)
 
+    def predict_fast(self, X: np.ndarray) -> np.ndarray:
+        """
+        Make predictions on a matrix from feature_matrix.
+
+        XGBoost models predict in place on the array through the booster,
+        skipping the sklearn wrapper and DMatrix construction.
+
+        Args:
+            X: C-contiguous float32 features in feature_columns order
+
+        Returns:
+            Array of predictions
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet")
+
+        if self.model_type == "xgboost":
+            return self.model.get_booster().inplace_predict(X, validate_features=False)
+        return self.model.predict(X)
+
     def evaluate(self, X_test: pd.DataFrame, y_test: pd.Series) -> Dict[str, float]:
         """
         Evaluate model on test set.
@@ -226,6 +305,9 @@ class ParkingForecaster:
 
         if hasattr(self.model, "feature_importances_"):
             importances = self.model.feature_importances_
+        elif hasattr(self.model, "feature_importance"):
+            # Raw LightGBM booster loaded from its text format
+            importances = self.model.feature_importance()
         else:
             raise ValueError(
                 f"Model {self.model_type} does not support feature importance"
@@ -239,27 +321,77 @@ class ParkingForecaster:
 
         return feature_imp
 
-    def save(self, filepath: str):
-        """Save trained model to disk."""
+    def save(self, filepath: str) -> Path:
+        """
+        Save trained model to disk.
+
+        XGBoost and LightGBM models are written in their native formats
+        (UBJSON / text), other models are pickled. Metadata goes into a JSON
+        sidecar next to the model file.
+
+        Args:
+            filepath: Model path; its suffix is replaced to match the format
+
+        Returns:
+            Path of the written model file
+        """
         if self.model is None:
             raise ValueError("Model not trained yet")
 
-        model_data = {
-            "model": self.model,
+        model_path = Path(filepath).with_suffix(MODEL_FILE_SUFFIXES[self.model_type])
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+
+        metadata = {
             "model_type": self.model_type,
             "feature_columns": self.feature_columns,
             "target_column": self.target_column,
         }
+        model_path.with_suffix(".json").write_text(json.dumps(metadata, indent=2))
+
+        # Write the model last: the server reloads when its mtime changes
+        if self.model_type == "xgboost":
+            self.model.save_model(model_path)
+        elif self.model_type == "lightgbm":
+            self.model.booster_.save_model(model_path)
+        else:
+            joblib.dump(self.model, model_path)
+
+        print(f"Model saved to {model_path}")
+        return model_path
+
+    def load(self, filepath: str, nthread: Optional[int] = None):
+        """
+        Load trained model and its JSON sidecar from disk.
+
+        Legacy joblib bundles, which hold the model together with its
+        metadata, are loaded as well.
+
+        Args:
+            filepath: Path of the model file
+            nthread: Threads XGBoost uses for prediction (default: all cores)
+        """
+        model_path = Path(filepath)
+        pickled = None
+        if model_path.suffix == LEGACY_MODEL_SUFFIX:
+            pickled = joblib.load(model_path)
+
+        if isinstance(pickled, dict):
+            metadata = pickled
+            pickled = metadata["model"]
+        else:
+            metadata = json.loads(model_path.with_suffix(".json").read_text())
+        self.model_type = metadata["model_type"]
+        self.feature_columns = metadata["feature_columns"]
+        self.target_column = metadata["target_column"]
+
+        if pickled is not None:
+            self.model = pickled
+        elif self.model_type == "xgboost":
+            self.model = xgb.XGBRegressor()
+            self.model.load_model(model_path)
+        elif self.model_type == "lightgbm":
+            self.model = lgb.Booster(model_file=str(model_path))
 
-        Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-        joblib.dump(model_data, filepath)
-        print(f"Model saved to {filepath}")
-
-    def load(self, filepath: str):
-        """Load trained model from disk."""
-        model_data = joblib.load(filepath)
-        self.model = model_data["model"]
-        self.model_type = model_data["model_type"]
-        self.feature_columns = model_data["feature_columns"]
-        self.target_column = model_data["target_column"]
+        if nthread and self.model_type == "xgboost":
+            self.model.get_booster().set_param({"nthread": nthread})
         print(f"Model loaded from {filepath}")
@@ -1,30 +1,127 @@
 """Prediction script for parking forecasting."""
 
-import sys
 from pathlib import Path
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent))
+import numpy as np
+import pandas as pd
 
-from data_loader import ParkingDataLoader
-from features import FeatureEngineer
-from models import ParkingForecaster
+from .data_loader import ParkingDataLoader, compute_occupancy
+from .features import FeatureEngineer
+from .models import ParkingForecaster, find_model_file
 
+# Rows of history per lot needed to rebuild the longest lag/rolling window
+FEATURE_LOOKBACK = 24
 
-def make_predictions(model_path: str = None, lot_id: str = None):
+
+def engineer_features(df: pd.DataFrame, cache_path: Path) -> pd.DataFrame:
+    """
+    Engineer features, reusing rows cached by a previous run.
+
+    Lag and rolling features of a reading depend only on the FEATURE_LOOKBACK
+    readings before it in its lot. Cached feature columns are matched to
+    readings by id and reused unless a reading within that span was added,
+    removed or changed its occupancy_rate (e.g. after a lot's capacity was
+    updated); the remaining rows go through feature engineering again
+    together with their history. Reading and lot columns always come from
+    df. The cache file itself is still read and rewritten in full, so I/O
+    grows with the total row count.
+
+    Args:
+        df: Readings with lot metadata and occupancy_rate
+        cache_path: Parquet file holding previously engineered features
+
+    Returns:
+        DataFrame with all features, aligned with df
+    """
+    engineer = FeatureEngineer()
+
+    cached = None
+    if cache_path.exists():
+        cached = pd.read_parquet(cache_path, engine="pyarrow")
+        # A cache built from differently shaped readings is not reusable
+        if cached.empty or not set(df.columns) <= set(cached.columns):
+            cached = None
+
+    if cached is None:
+        features = engineer.create_all_features(df)
+    else:
+        lots = df.groupby("lot_id", observed=True)
+        position = lots.cumcount().to_numpy()
+        prev_id = lots["id"].shift(1, fill_value=-1).to_numpy()
+        cached_prev_id = (
+            cached.groupby("lot_id", observed=True)["id"]
+            .shift(1, fill_value=-1)
+            .to_numpy()
+        )
+
+        # A reading is unchanged if it is cached with the same predecessor and
+        # occupancy rate; a row is stale if any reading in its span changed
+        cached_pos = pd.Index(cached["id"]).get_indexer(df["id"])
+        rate = df["occupancy_rate"].to_numpy()
+        cached_rate = cached["occupancy_rate"].to_numpy()[cached_pos]
+        changed = (
+            (cached_pos < 0)
+            | (cached_prev_id[cached_pos] != prev_id)
+            | ((cached_rate != rate) & ~(np.isnan(cached_rate) & np.isnan(rate)))
+        )
+        last_changed = (
+            pd.Series(np.where(changed, position, np.nan), index=df.index)
+            .groupby(df["lot_id"], observed=True)
+            .ffill()
+        )
+        stale = (position - last_changed < FEATURE_LOOKBACK).to_numpy()
+
+        # Stale rows need FEATURE_LOOKBACK rows of history before them
+        next_stale = (
+            pd.Series(np.where(stale, position, np.nan), index=df.index)
+            .groupby(df["lot_id"], observed=True)
+            .bfill()
+        )
+        needed = (next_stale - position <= FEATURE_LOOKBACK).to_numpy()
+
+        feature_columns = cached.columns.difference(df.columns, sort=False)
+        kept = pd.concat(
+            [
+                df[~stale],
+                cached.iloc[cached_pos[~stale]][feature_columns].set_axis(
+                    df.index[~stale]
+                ),
+            ],
+            axis=1,
+        )
+        fresh = engineer.create_all_features(df[needed])[stale[needed]]
+        features = pd.concat([kept, fresh]).loc[df.index]
+
+        if not stale.any() and len(cached) == len(df):
+            return features
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    features.to_parquet(cache_path, compression="zstd", engine="pyarrow")
+
+    return features
+
+
+def make_predictions(
+    model_path: str = None,
+    lot_id: str = None,
+    last_n_days: int = None,
+    parquet_dir: str = None,
+):
     """
     Make predictions using a trained model.
 
     Args:
         model_path: Path to saved model file
         lot_id: Specific parking lot ID to predict (if None, predicts all)
+        last_n_days: Only load readings from the last N days (if None, loads all)
+        parquet_dir: Load data from a Parquet export instead of SQLite
     """
     print("=== Parking Availability Prediction ===\n")
 
     # Determine model path
     if model_path is None:
-        model_path = (
-            Path(__file__).parent.parent / "models" / "parking_forecaster_xgboost.pkl"
+        model_path = find_model_file(
+            Path(__file__).parent.parent / "models" / "parking_forecaster_xgboost.ubj"
         )
 
     if not Path(model_path).exists():
@@ -39,28 +136,52 @@ def make_predictions(model_path: str = None, lot_id: str = None):
 
     # Load latest data
     print("\n2. Loading latest parking data...")
-    loader = ParkingDataLoader()
-
-    if lot_id:
-        df = loader.load_readings(lot_ids=[lot_id])
-        df = df.merge(
-            loader.load_parking_lots()[["id", "name", "total"]],
-            left_on="lot_id",
-            right_on="id",
+    if parquet_dir:
+        df = ParkingDataLoader.load_parquet(
+            parquet_dir,
+            lot_ids=[lot_id] if lot_id else None,
+            last_n_days=last_n_days,
         )
-        df["occupied"] = df["total"] - df["free"]
-        df["occupancy_rate"] = (df["occupied"] / df["total"]) * 100
+    elif lot_id:
+        db_path = Path(__file__).parent.parent.parent / "data" / "parking.db"
+        loader = ParkingDataLoader(db_path)
+        df = loader.load_readings(lot_ids=[lot_id], last_n_days=last_n_days)
+        lots = loader.load_parking_lots()[["id", "name", "total"]]
+        # Rename the lot id so the reading id keeps its name
+        lots = loader.align_lot_categories(df, lots).rename(columns={"id": "lot_id"})
+        df = df.merge(lots, on="lot_id")
+        occupied, rate = compute_occupancy(df["total"], df["free"])
+        df = df.assign(occupied=occupied, occupancy_rate=rate)
     else:
-        df = loader.load_combined_data()
+        db_path = Path(__file__).parent.parent.parent / "data" / "parking.db"
+        loader = ParkingDataLoader(db_path)
+        df = loader.load_combined_data(last_n_days=last_n_days)
 
     print(f"   Loaded {len(df)} readings")
 
+    if df.empty:
+        print("Error: No readings found for the requested lot and time window")
+        if last_n_days:
+            print(f"Try a longer window than --days {last_n_days}")
+        return
+
     # Engineer features
     print("\n3. Engineering features...")
-    engineer = FeatureEngineer()
-    df = engineer.create_all_features(df)
+    # Parquet exports and SQLite queries yield different columns, so each
+    # source and lot selection gets its own cache
+    source = "parquet" if parquet_dir else "sqlite"
+    cache_name = f"features_cache_{source}"
+    if lot_id:
+        cache_name += f"_{lot_id}"
+    cache_path = Path(model_path).parent / f"{cache_name}.parquet"
+    df = engineer_features(df, cache_path)
     df = df.dropna()
 
+    if df.empty:
+        print("Error: No readings with enough history for lag/rolling features")
+        print("Try a longer window or collect more data")
+        return
+
     # Prepare features
     print("\n4. Preparing features for prediction...")
     X = df[forecaster.feature_columns].fillna(0)
@@ -93,14 +214,13 @@ def make_predictions(model_path: str = None, lot_id: str = None):
     else:
         # Show summary for all lots
         print("Summary by Parking Lot:")
+        df["abs_error"] = df["prediction_error"].abs()
         summary = (
-            df.groupby("name")
+            df.groupby("name", sort=False, observed=True)
             .agg(
-                {
-                    "actual_occupancy": "mean",
-                    "predicted_occupancy": "mean",
-                    "prediction_error": lambda x: x.abs().mean(),
-                }
+                actual=("actual_occupancy", "mean"),
+                predicted=("predicted_occupancy", "mean"),
+                mae=("abs_error", "mean"),
             )
             .round(2)
         )
@@ -108,7 +228,7 @@ def make_predictions(model_path: str = None, lot_id: str = None):
         summary = summary.sort_values("MAE (%)", ascending=False).head(10)
         print(summary)
 
-        print(f"\nOverall MAE: {df['prediction_error'].abs().mean():.2f}%")
+        print(f"\nOverall MAE: {df['abs_error'].mean():.2f}%")
 
     print("\n=== Prediction Complete ===\n")
 
@@ -141,6 +261,18 @@ if __name__ == "__main__":
     parser.add_argument(
         "--lot-id", type=str, default=None, help="Specific parking lot ID to predict"
     )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=None,
+        help="Only load readings from the last N days",
+    )
+    parser.add_argument(
+        "--parquet-dir",
+        type=str,
+        default=None,
+        help="Load data from a Parquet export (see: pixi run export)",
+    )
     parser.add_argument(
         "--future",
         action="store_true",
@@ -160,4 +292,9 @@ if __name__ == "__main__":
             model_path=args.model, lot_id=args.lot_id, hours_ahead=args.hours
         )
     else:
-        make_predictions(model_path=args.model, lot_id=args.lot_id)
+        make_predictions(
+            model_path=args.model,
+            lot_id=args.lot_id,
+            last_n_days=args.days,
+            parquet_dir=args.parquet_dir,
+        )
@@ -1,23 +1,26 @@
 """FastAPI server for parking occupancy forecasting."""
 
-import sys
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
-from fastapi import FastAPI, HTTPException, Query
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent))
+from .data_loader import ParkingDataLoader, compute_occupancy
+from .features import FeatureEngineer
+from .models import ParkingForecaster, find_model_file
 
-from data_loader import ParkingDataLoader
-from features import FeatureEngineer
-from models import ParkingForecaster
 
-
-# Pydantic models
+# Pydantic models; endpoints build them from already typed database rows with
+# model_construct() and leave validation to the response_model check
 class ParkingLot(BaseModel):
     """Parking lot information."""
     id: str
@@ -81,35 +84,81 @@ data_loader: Optional[ParkingDataLoader] = None
 model_path: Optional[Path] = None
 model_last_modified: Optional[float] = None
 
+# Native model file; find_model_file falls back to a legacy .pkl bundle
+MODEL_FILE = Path(__file__).parent.parent / "models" / "parking_forecaster_xgboost.ubj"
+
+# Seconds between checks of the model file for a newer version
+MODEL_CHECK_INTERVAL = 5.0
+model_checked_at: float = float("-inf")
+
+# Parking lot metadata is near-static, so it is cached and refreshed on a TTL
+LOTS_CACHE_TTL = 300.0
+lots_df: Optional[pd.DataFrame] = None
+lots_by_id: dict = {}
+lots_json: Optional[bytes] = None
+lots_loaded_at: Optional[float] = None
+lots_lock = asyncio.Lock()
+LOTS_ADAPTER = TypeAdapter(List[ParkingLot])
+
+# Serialized /health body, polled by monitoring
+HEALTH_CACHE_TTL = 10.0
+health_json: Optional[bytes] = None
+health_cached_at: Optional[float] = None
+
+# Latest complete feature row per lot for /forecast
+FEATURE_CACHE_TTL = 60.0
+latest_features: Optional[pd.DataFrame] = None
+features_loaded_at: Optional[float] = None
+features_lock = asyncio.Lock()
+
+# Blocking pandas/SQLite/model work runs in worker threads so the event loop
+# keeps serving cached endpoints; the boosters are multithreaded themselves,
+# so only a few predictions run at once
+WORKER_THREADS = os.cpu_count() or 4
+MAX_CONCURRENT_PREDICTIONS = 2
+prediction_slots = asyncio.Semaphore(MAX_CONCURRENT_PREDICTIONS)
+
 
 def load_model():
     """Load the trained forecasting model."""
     global forecaster, model_path, model_last_modified
     
-    model_path = Path(__file__).parent.parent / "models" / "parking_forecaster_xgboost.pkl"
+    model_path = find_model_file(MODEL_FILE)
     
     if not model_path.exists():
         raise RuntimeError(f"Model not found at {model_path}. Please train a model first.")
     
     forecaster = ParkingForecaster()
-    forecaster.load(str(model_path))
+    # Split the cores between the predictions allowed to run at once
+    forecaster.load(str(model_path), nthread=max(1, WORKER_THREADS // MAX_CONCURRENT_PREDICTIONS))
     model_last_modified = model_path.stat().st_mtime
     print(f"Loaded model from {model_path} (modified: {datetime.fromtimestamp(model_last_modified)})")
 
 
 def check_and_reload_model():
     """Check if model file has changed and reload if necessary."""
-    global forecaster, model_path, model_last_modified
+    global forecaster, model_path, model_last_modified, model_checked_at, health_json
     
-    if model_path is None or not model_path.exists():
+    # Throttle the filesystem check on hot forecast requests
+    now = time.monotonic()
+    if now - model_checked_at < MODEL_CHECK_INTERVAL:
         return
+    model_checked_at = now
     
-    current_mtime = model_path.stat().st_mtime
+    # A retrained native model replaces a legacy .pkl bundle
+    current_path = find_model_file(MODEL_FILE)
+    if not current_path.exists():
+        return
+    
+    current_mtime = current_path.stat().st_mtime
     
-    if model_last_modified is None or current_mtime > model_last_modified:
+    if current_path != model_path or model_last_modified is None or current_mtime > model_last_modified:
         print("Model file changed, reloading...")
         try:
             load_model()
+            invalidate_lots_cache()
+            invalidate_feature_cache()
+            health_json = None
             print("Model reloaded successfully")
         except Exception as e:
             print(f"Failed to reload model: {e}")
@@ -124,15 +173,127 @@ def initialize_data_loader():
     if not db_path.exists():
         raise RuntimeError(f"Database not found at {db_path}")
     
-    data_loader = ParkingDataLoader(db_path)
+    data_loader = ParkingDataLoader(db_path, persistent=True)
     print(f"Initialized data loader with database at {db_path}")
 
 
+def refresh_lots_cache():
+    """Reload parking lot metadata and its lookup by lot ID."""
+    global lots_df, lots_by_id, lots_json, lots_loaded_at
+
+    lots_df = data_loader.load_parking_lots()
+    lots_by_id = {row['id']: row for row in lots_df.to_dict('records')}
+    lots_json = None
+    lots_loaded_at = time.monotonic()
+
+
+def invalidate_lots_cache():
+    """Force the next lots lookup to hit the database."""
+    global lots_loaded_at
+    lots_loaded_at = None
+
+
+async def get_lots_cached() -> pd.DataFrame:
+    """Return cached parking lot metadata, refreshing it after the TTL."""
+    async with lots_lock:
+        if lots_loaded_at is None or time.monotonic() - lots_loaded_at > LOTS_CACHE_TTL:
+            await asyncio.to_thread(refresh_lots_cache)
+    return lots_df
+
+
+def refresh_feature_cache():
+    """Engineer features for all lots and keep the latest complete row of each."""
+    global latest_features, features_loaded_at
+    
+    df = data_loader.load_combined_data_cached()
+    
+    engineer = FeatureEngineer()
+    df = engineer.add_temporal_features(df)
+    df = engineer.add_lag_features(df, 'occupancy_rate', lags=[1, 2, 3], group_col='lot_id')
+    df = engineer.add_rolling_features(df, 'occupancy_rate', windows=[3], group_col='lot_id')
+    
+    # Drop rows with NaN and keep the most recent reading for each lot; the
+    # combined data is already in timestamp order
+    df = df.dropna()
+    latest = df.groupby('lot_id', observed=True).tail(1)
+    
+    latest_features = latest.set_index('lot_id')
+    features_loaded_at = time.monotonic()
+
+
+def invalidate_feature_cache():
+    """Force the next forecast to rebuild the feature cache."""
+    global features_loaded_at
+    features_loaded_at = None
+
+
+async def get_latest_features() -> pd.DataFrame:
+    """Return the latest feature row per lot, rebuilding it after the TTL."""
+    async with features_lock:
+        if features_loaded_at is None or time.monotonic() - features_loaded_at > FEATURE_CACHE_TTL:
+            await asyncio.to_thread(refresh_feature_cache)
+    return latest_features
+
+
+# Readings /forecast/{lot_id} needs: the current one plus the longest lag (3)
+FORECAST_HISTORY = 4
+
+
+def engineer_lot_features(df: pd.DataFrame, lot: dict) -> pd.DataFrame:
+    """
+    Engineer features from one lot's most recent readings.
+
+    Blocking, called from worker threads.
+
+    Args:
+        df: The lot's last FORECAST_HISTORY readings
+        lot: Cached metadata of the lot
+
+    Returns:
+        The latest row if its features are complete, otherwise an empty frame
+    """
+    occupied, rate = compute_occupancy(np.full(len(df), lot['total']), df['free'])
+    df = df.assign(
+        name=lot['name'],
+        total=lot['total'],
+        lot_type=lot['lot_type'],
+        latitude=lot['latitude'],
+        longitude=lot['longitude'],
+        occupied=occupied,
+        occupancy_rate=rate,
+    )
+    
+    engineer = FeatureEngineer()
+    df = engineer.add_temporal_features(df)
+    df = engineer.add_lag_features(df, 'occupancy_rate', lags=[1, 2, 3], group_col='lot_id')
+    df = engineer.add_rolling_features(df, 'occupancy_rate', windows=[3], group_col='lot_id')
+    
+    return df.iloc[-1:].dropna()
+
+
+def predict_features(features: pd.DataFrame) -> np.ndarray:
+    """Run the model on feature rows; blocking, called from worker threads."""
+    return forecaster.predict_fast(forecaster.feature_matrix(features))
+
+
+def confidence_bounds(predictions) -> Tuple[np.ndarray, np.ndarray]:
+    """Simple confidence interval (±10%), clipped to valid occupancy rates."""
+    predictions = np.asarray(predictions, dtype=np.float64)
+    lows = np.clip(predictions - 10.0, 0.0, 100.0)
+    highs = np.clip(predictions + 10.0, 0.0, 100.0)
+    return lows, highs
+
+
 @app.on_event("startup")
 async def startup_event():
     """Load model and initialize data on startup."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="forecast-worker")
+    )
     initialize_data_loader()
     load_model()
+    refresh_lots_cache()
+    refresh_feature_cache()
     print("API server started successfully")
 
 
@@ -158,14 +319,19 @@ async def health_check():
     if data_loader is None:
         raise HTTPException(status_code=503, detail="Data loader not initialized")
     
-    lots = data_loader.load_parking_lots()
+    global health_json, health_cached_at
     
-    return HealthResponse(
-        status="healthy",
-        model_loaded=forecaster is not None,
-        model_type=forecaster.model_type if forecaster else None,
-        total_lots=len(lots)
-    )
+    if health_json is None or time.monotonic() - health_cached_at > HEALTH_CACHE_TTL:
+        lots = await get_lots_cached()
+        health_json = HealthResponse(
+            status="healthy",
+            model_loaded=forecaster is not None,
+            model_type=forecaster.model_type if forecaster else None,
+            total_lots=len(lots)
+        ).model_dump_json().encode()
+        health_cached_at = time.monotonic()
+    
+    return Response(content=health_json, media_type="application/json")
 
 
 @app.get("/lots", response_model=List[ParkingLot])
@@ -174,18 +340,78 @@ async def get_parking_lots():
     if data_loader is None:
         raise HTTPException(status_code=503, detail="Data loader not initialized")
     
-    lots_df = data_loader.load_parking_lots()
+    global lots_json
+    
+    lots = await get_lots_cached()
+    
+    # The body is serialized once per cache refresh and validated here, as
+    # FastAPI passes a raw Response through unchecked
+    if lots_json is None:
+        # Pull each column out once instead of boxing rows with iterrows()
+        lots_json = LOTS_ADAPTER.dump_json([
+            ParkingLot(
+                id=id_,
+                name=name,
+                total=int(total),
+                lot_type=lot_type,
+                latitude=float(latitude),
+                longitude=float(longitude)
+            )
+            for id_, name, total, lot_type, latitude, longitude in zip(
+                lots['id'].tolist(),
+                lots['name'].tolist(),
+                lots['total'].tolist(),
+                lots['lot_type'].tolist(),
+                lots['latitude'].tolist(),
+                lots['longitude'].tolist(),
+            )
+        ])
+    
+    return Response(content=lots_json, media_type="application/json")
+
+
+def current_status(lot_id: Optional[str] = None) -> List[CurrentStatus]:
+    """Build the /current response; blocking, called from worker threads."""
+    # Get the latest reading for each lot
+    df = data_loader.load_latest_readings(lot_ids=[lot_id] if lot_id else None)
+    
+    if df.empty:
+        return []
+    
+    # Join with the cached lot information
+    lots = [lots_by_id.get(lot_id_) for lot_id_ in df['lot_id'].tolist()]
+    known = np.fromiter((lot is not None for lot in lots), dtype=bool, count=len(lots))
+    lots = [lot for lot in lots if lot is not None]
+    df = df[known]
+    
+    # Occupancy for the latest rows only, as plain arrays
+    total = np.array([lot['total'] for lot in lots], dtype=np.int64)
+    free = df['free'].to_numpy(dtype=np.int64)
+    occupied = total - free
+    # Handle division by zero
+    occupancy_rate = np.zeros(len(total))
+    np.divide(occupied, total, out=occupancy_rate, where=total != 0)
+    occupancy_rate *= 100
     
     return [
-        ParkingLot(
-            id=row['id'],
-            name=row['name'],
-            total=int(row['total']),
-            lot_type=row['lot_type'],
-            latitude=float(row['latitude']),
-            longitude=float(row['longitude'])
+        CurrentStatus.model_construct(
+            lot_id=lot_id_,
+            name=lot['name'],
+            total=total_,
+            free=free_,
+            occupied=occupied_,
+            occupancy_rate=rate,
+            timestamp=timestamp.isoformat()
+        )
+        for lot_id_, lot, total_, free_, occupied_, rate, timestamp in zip(
+            df['lot_id'].tolist(),
+            lots,
+            total.tolist(),
+            free.tolist(),
+            occupied.tolist(),
+            occupancy_rate.tolist(),
+            df['timestamp'].tolist(),
         )
-        for _, row in lots_df.iterrows()
     ]
 
 
@@ -196,45 +422,8 @@ async def get_current_status(lot_id: Optional[str] = Query(None, description="Fi
         raise HTTPException(status_code=503, detail="Data loader not initialized")
     
     try:
-        # Get the latest reading for each lot
-        if lot_id:
-            df = data_loader.load_readings(lot_ids=[lot_id])
-        else:
-            df = data_loader.load_readings()
-        
-        if df.empty:
-            return []
-        
-        # Get the most recent reading for each lot
-        df = df.sort_values('timestamp').groupby('lot_id').tail(1)
-        
-        # Merge with lot information
-        lots_df = data_loader.load_parking_lots()
-        merged = df.merge(
-            lots_df[['id', 'name', 'total']],
-            left_on='lot_id',
-            right_on='id'
-        )
-        
-        merged['occupied'] = merged['total'] - merged['free']
-        # Handle division by zero and ensure valid float values
-        merged['occupancy_rate'] = merged.apply(
-            lambda row: 0.0 if row['total'] == 0 else (row['occupied'] / row['total']) * 100,
-            axis=1
-        )
-        
-        return [
-            CurrentStatus(
-                lot_id=row['lot_id'],
-                name=row['name'],
-                total=int(row['total']),
-                free=int(row['free']),
-                occupied=int(row['occupied']),
-                occupancy_rate=float(row['occupancy_rate']),
-                timestamp=row['timestamp'].isoformat()
-            )
-            for _, row in merged.iterrows()
-        ]
+        await get_lots_cached()
+        return await asyncio.to_thread(current_status, lot_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching current status: {str(e)}")
 
@@ -251,61 +440,38 @@ async def get_forecast(lot_id: str):
         raise HTTPException(status_code=503, detail="Data loader not initialized")
     
     try:
-        # Load recent data for the lot
-        df = data_loader.load_readings(lot_ids=[lot_id])
+        # Lag and rolling features only reach a few readings back
+        df = await asyncio.to_thread(
+            data_loader.load_last_n_readings, lot_id, FORECAST_HISTORY
+        )
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found for lot {lot_id}")
         
         # Get lot info
-        lots_df = data_loader.load_parking_lots()
-        lot_info = lots_df[lots_df['id'] == lot_id]
+        await get_lots_cached()
+        lot_info = lots_by_id.get(lot_id)
         
-        if lot_info.empty:
+        if lot_info is None:
             raise HTTPException(status_code=404, detail=f"Lot {lot_id} not found")
         
-        lot_name = lot_info.iloc[0]['name']
-        
-        # Merge with lot information
-        df = df.merge(
-            lots_df[['id', 'name', 'total', 'lot_type', 'latitude', 'longitude']],
-            left_on='lot_id',
-            right_on='id'
-        )
-        
-        df['occupied'] = df['total'] - df['free']
-        df['occupancy_rate'] = (df['occupied'] / df['total']) * 100
-        
-        # Engineer features
-        engineer = FeatureEngineer()
-        df = engineer.add_temporal_features(df)
-        df = engineer.add_lag_features(df, 'occupancy_rate', lags=[1, 2, 3], group_col='lot_id')
-        df = engineer.add_rolling_features(df, 'occupancy_rate', windows=[3], group_col='lot_id')
-        
-        # Get the most recent complete row
-        df = df.dropna()
+        latest = await asyncio.to_thread(engineer_lot_features, df, lot_info)
         
-        if df.empty:
+        if latest.empty:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Insufficient historical data for lot {lot_id}. Need at least 3 recent readings."
             )
         
-        latest = df.iloc[-1:]
-        
-        # Prepare features
-        X = latest[forecaster.feature_columns].fillna(0)
-        
         # Make prediction
-        prediction = forecaster.predict(X)[0]
+        async with prediction_slots:
+            prediction = (await asyncio.to_thread(predict_features, latest))[0]
         
-        # Simple confidence interval (±10%)
-        confidence_low = max(0, prediction - 10)
-        confidence_high = min(100, prediction + 10)
+        confidence_low, confidence_high = confidence_bounds(prediction)
         
-        return Forecast(
+        return Forecast.model_construct(
             lot_id=lot_id,
-            name=lot_name,
+            name=lot_info['name'],
             predicted_occupancy_rate=float(prediction),
             confidence_low=float(confidence_low),
             confidence_high=float(confidence_high),
@@ -330,49 +496,36 @@ async def get_all_forecasts():
         raise HTTPException(status_code=503, detail="Data loader not initialized")
     
     try:
-        # Load all data
-        df = data_loader.load_combined_data()
+        latest_per_lot = await get_latest_features()
         
-        if df.empty:
+        if latest_per_lot.empty:
             return []
         
-        # Engineer features
-        engineer = FeatureEngineer()
-        df = engineer.add_temporal_features(df)
-        df = engineer.add_lag_features(df, 'occupancy_rate', lags=[1, 2, 3], group_col='lot_id')
-        df = engineer.add_rolling_features(df, 'occupancy_rate', windows=[3], group_col='lot_id')
-        
-        # Drop rows with NaN
-        df = df.dropna()
-        
-        if df.empty:
-            return []
-        
-        # Get the most recent reading for each lot
-        latest_per_lot = df.sort_values('timestamp').groupby('lot_id').tail(1)
-        
-        # Prepare features
-        X = latest_per_lot[forecaster.feature_columns].fillna(0)
-        
         # Make predictions
-        predictions = forecaster.predict(X)
+        async with prediction_slots:
+            predictions = await asyncio.to_thread(predict_features, latest_per_lot)
+        predictions = predictions.astype(np.float64, copy=False)
+        lows, highs = confidence_bounds(predictions)
+        forecast_time = datetime.now().isoformat()
         
         # Build response
-        forecasts = []
-        for idx, (_, row) in enumerate(latest_per_lot.iterrows()):
-            prediction = predictions[idx]
-            forecasts.append(
-                Forecast(
-                    lot_id=row['lot_id'],
-                    name=row['name'],
-                    predicted_occupancy_rate=float(prediction),
-                    confidence_low=float(max(0, prediction - 10)),
-                    confidence_high=float(min(100, prediction + 10)),
-                    forecast_time=datetime.now().isoformat()
-                )
+        return [
+            Forecast.model_construct(
+                lot_id=lot_id_,
+                name=name,
+                predicted_occupancy_rate=prediction,
+                confidence_low=low,
+                confidence_high=high,
+                forecast_time=forecast_time
             )
-        
-        return forecasts
+            for lot_id_, name, prediction, low, high in zip(
+                latest_per_lot.index.tolist(),
+                latest_per_lot['name'].tolist(),
+                predictions.tolist(),
+                lows.tolist(),
+                highs.tolist(),
+            )
+        ]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating forecasts: {str(e)}")
 
@@ -1,15 +1,14 @@
 """Training script for parking forecasting models."""
 
-import sys
+import logging
+import math
 from pathlib import Path
-from sklearn.model_selection import train_test_split
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent))
+from .data_loader import ParkingDataLoader
+from .features import FeatureEngineer
+from .models import ParkingForecaster
 
-from data_loader import ParkingDataLoader
-from features import FeatureEngineer
-from models import ParkingForecaster
+logger = logging.getLogger(__name__)
 
 
 def train_model(model_type: str = "xgboost", save_model: bool = True):
@@ -17,97 +16,100 @@ def train_model(model_type: str = "xgboost", save_model: bool = True):
     Train a parking forecasting model.
 
     Args:
-        model_type: Type of model to train ('xgboost', 'lightgbm', 'random_forest')
+        model_type: Type of model to train ('xgboost', 'lightgbm', 'hist_gbm')
         save_model: Whether to save the trained model
     """
-    print(f"=== Training {model_type.upper()} Model ===\n")
+    logger.info("=== Training %s Model ===\n", model_type.upper())
 
     # Load data
-    print("1. Loading data...")
+    logger.info("1. Loading data...")
     db_path = Path(__file__).parent.parent.parent / "data" / "parking.db"
     loader = ParkingDataLoader(db_path)
-    df = loader.load_combined_data()
-    print(f"   Loaded {len(df)} readings from {df['lot_id'].nunique()} parking lots")
+    df = loader.load_combined_data_cached()
+    logger.info(
+        "   Loaded %d readings from %d parking lots", len(df), df["lot_id"].nunique()
+    )
 
     # Engineer features
-    print("\n2. Engineering features...")
+    logger.info("\n2. Engineering features...")
     engineer = FeatureEngineer()
-    print(f"   Before feature engineering: {len(df)} rows")
+    logger.debug("   Before feature engineering: %d rows", len(df))
     # Use smaller lags for limited data
     df = engineer.add_temporal_features(df)
-    print(f"   After temporal features: {len(df)} rows, {df.shape[1]} columns")
+    logger.debug("   After temporal features: %d rows, %d columns", *df.shape)
     
     # Only use small lags that won't eliminate all data
     df = engineer.add_lag_features(df, 'occupancy_rate', lags=[1, 2, 3], group_col='lot_id')
-    print(f"   After lag features: {len(df)} rows, {df.shape[1]} columns")
+    logger.debug("   After lag features: %d rows, %d columns", *df.shape)
     
     df = engineer.add_rolling_features(df, 'occupancy_rate', windows=[3], group_col='lot_id')
-    print(f"   After rolling features: {len(df)} rows, {df.shape[1]} columns")
-    print(f"   NaN counts: {df.isna().sum().sum()} total NaN values")
+    logger.debug("   After rolling features: %d rows, %d columns", *df.shape)
+    # Counting NaNs scans the whole frame, so only do it when it is logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   NaN counts: %d total NaN values", df.isna().sum().sum())
 
     # Drop rows with NaN values from lag/rolling features
     df = df.dropna()
-    print(f"   After dropping NaN: {len(df)} rows")
+    logger.info("   After dropping NaN: %d rows", len(df))
     
     if len(df) == 0:
-        print("\n   ERROR: No data remaining after dropping NaN values!")
-        print("   This suggests the database has insufficient data for time series features.")
-        print("   Try collecting more data or reducing lag periods.")
+        logger.error("\n   ERROR: No data remaining after dropping NaN values!")
+        logger.error("   This suggests the database has insufficient data for time series features.")
+        logger.error("   Try collecting more data or reducing lag periods.")
         return None, None
 
     # Prepare data
-    print("\n3. Preparing data for training...")
+    logger.info("\n3. Preparing data for training...")
     forecaster = ParkingForecaster(model_type=model_type)
     X, y = forecaster.prepare_data(df)
-    print(f"   Features shape: {X.shape}")
-    print(f"   Target shape: {y.shape}")
+    logger.info("   Features shape: %s", X.shape)
+    logger.info("   Target shape: %s", y.shape)
 
     # Split data (80/20 train/test split)
-    print("\n4. Splitting data...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X,
-        y,
-        test_size=0.2,
-        shuffle=False,  # No shuffle for time series
-    )
-    print(f"   Train size: {len(X_train)} samples")
-    print(f"   Test size: {len(X_test)} samples")
+    logger.info("\n4. Splitting data...")
+    # No shuffle for time series: the last 20% (rounded up) is the test set
+    n_train = len(X) - math.ceil(len(X) * 0.2)
+    X_train, X_test = X.iloc[:n_train], X.iloc[n_train:]
+    y_train, y_test = y.iloc[:n_train], y.iloc[n_train:]
+    logger.info("   Train size: %d samples", len(X_train))
+    logger.info("   Test size: %d samples", len(X_test))
 
     # Train model
-    print("\n5. Training model...")
+    logger.info("\n5. Training model...")
     train_metrics = forecaster.train(X_train, y_train, X_test, y_test)
 
-    print("\n   Training Metrics:")
+    logger.info("\n   Training Metrics:")
     for metric, value in train_metrics.items():
-        print(f"     {metric}: {value:.4f}")
+        logger.info("     %s: %.4f", metric, value)
 
     # Evaluate on test set
-    print("\n6. Evaluating on test set...")
+    logger.info("\n6. Evaluating on test set...")
     eval_metrics = forecaster.evaluate(X_test, y_test)
 
-    print("\n   Evaluation Metrics:")
-    print(f"     MAE:  {eval_metrics['mae']:.4f}% occupancy")
-    print(f"     RMSE: {eval_metrics['rmse']:.4f}% occupancy")
-    print(f"     R²:   {eval_metrics['r2']:.4f}")
-    print(f"     MAPE: {eval_metrics['mape']:.2f}%")
+    logger.info("\n   Evaluation Metrics:")
+    logger.info("     MAE:  %.4f%% occupancy", eval_metrics["mae"])
+    logger.info("     RMSE: %.4f%% occupancy", eval_metrics["rmse"])
+    logger.info("     R²:   %.4f", eval_metrics["r2"])
+    logger.info("     MAPE: %.2f%%", eval_metrics["mape"])
 
     # Feature importance
-    print("\n7. Top 10 most important features:")
-    feature_imp = forecaster.get_feature_importance(top_n=10)
-    for idx, row in feature_imp.iterrows():
-        print(f"     {row['feature']}: {row['importance']:.4f}")
+    logger.info("\n7. Top 10 most important features:")
+    try:
+        feature_imp = forecaster.get_feature_importance(top_n=10)
+        for feature, importance in zip(feature_imp["feature"], feature_imp["importance"]):
+            logger.info("     %s: %.4f", feature, importance)
+    except ValueError as e:
+        logger.info("     %s", e)
 
     # Save model
     if save_model:
-        print("\n8. Saving model...")
+        logger.info("\n8. Saving model...")
         model_path = (
-            Path(__file__).parent.parent
-            / "models"
-            / f"parking_forecaster_{model_type}.pkl"
+            Path(__file__).parent.parent / "models" / f"parking_forecaster_{model_type}"
         )
         forecaster.save(str(model_path))
 
-    print("\n=== Training Complete ===\n")
+    logger.info("\n=== Training Complete ===\n")
 
     return forecaster, eval_metrics
 
@@ -120,13 +122,20 @@ if __name__ == "__main__":
         "--model",
         type=str,
         default="xgboost",
-        choices=["xgboost", "lightgbm", "random_forest"],
+        choices=["xgboost", "lightgbm", "hist_gbm"],
         help="Model type to train",
     )
     parser.add_argument(
         "--no-save", action="store_true", help="Do not save the trained model"
     )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Log per-step frame diagnostics"
+    )
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s"
+    )
+
     train_model(model_type=args.model, save_model=not args.no_save)
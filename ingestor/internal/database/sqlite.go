@@ -72,6 +72,7 @@ func InitDB(dbPath string) (*sql.DB, error) {
 			lot_id TEXT NOT NULL,
 			city TEXT NOT NULL,
 			timestamp TIMESTAMP NOT NULL,
+			timestamp_epoch INTEGER,
 			free INTEGER NOT NULL,
 			state TEXT NOT NULL,
 			FOREIGN KEY (lot_id) REFERENCES parking_lots(id)
@@ -99,9 +100,58 @@ func InitDB(dbPath string) (*sql.DB, error) {
 		return nil, err
 	}
 
+	// Create composite index so the latest reading per lot is an index seek
+	_, err = db.Exec(`
+		CREATE INDEX IF NOT EXISTS idx_readings_lot_timestamp
+		ON parking_readings(lot_id, timestamp)
+	`)
+	if err != nil {
+		return nil, err
+	}
+
+	if err := migrateTimestampEpoch(db); err != nil {
+		return nil, err
+	}
+
 	return db, nil
 }
 
+// migrateTimestampEpoch adds the integer timestamp_epoch column to databases
+// created before it existed, backfills it from the TEXT timestamp and indexes
+// it so range filters compare integers instead of strings
+func migrateTimestampEpoch(db *sql.DB) error {
+	var count int
+	err := db.QueryRow(`
+		SELECT COUNT(*) FROM pragma_table_info('parking_readings')
+		WHERE name = 'timestamp_epoch'
+	`).Scan(&count)
+	if err != nil {
+		return err
+	}
+
+	if count == 0 {
+		_, err = db.Exec(`ALTER TABLE parking_readings ADD COLUMN timestamp_epoch INTEGER`)
+		if err != nil {
+			return err
+		}
+	}
+
+	_, err = db.Exec(`
+		UPDATE parking_readings
+		SET timestamp_epoch = CAST(strftime('%s', timestamp) AS INTEGER)
+		WHERE timestamp_epoch IS NULL
+	`)
+	if err != nil {
+		return err
+	}
+
+	_, err = db.Exec(`
+		CREATE INDEX IF NOT EXISTS idx_readings_timestamp_epoch
+		ON parking_readings(timestamp_epoch)
+	`)
+	return err
+}
+
 // UpsertParkingLot inserts or updates a parking lot
 func UpsertParkingLot(db *sql.DB, lot *ParkingLot) error {
 	_, err := db.Exec(`
@@ -127,9 +177,10 @@ func UpsertParkingLot(db *sql.DB, lot *ParkingLot) error {
 // InsertReading inserts a new parking reading
 func InsertReading(db *sql.DB, reading *ParkingReading) error {
 	_, err := db.Exec(`
-		INSERT INTO parking_readings (lot_id, city, timestamp, free, state)
-		VALUES (?, ?, ?, ?, ?)
-	`, reading.LotID, reading.City, reading.Timestamp, reading.Free, reading.State)
+		INSERT INTO parking_readings (lot_id, city, timestamp, timestamp_epoch, free, state)
+		VALUES (?, ?, ?, ?, ?, ?)
+	`, reading.LotID, reading.City, reading.Timestamp, reading.Timestamp.Unix(),
+		reading.Free, reading.State)
 
 	return err
 }
@@ -159,9 +210,10 @@ func UpsertParkingLotTx(tx *sql.Tx, lot *ParkingLot) error {
 // InsertReadingTx inserts a reading within a transaction
 func InsertReadingTx(tx *sql.Tx, reading *ParkingReading) error {
 	_, err := tx.Exec(`
-		INSERT INTO parking_readings (lot_id, city, timestamp, free, state)
-		VALUES (?, ?, ?, ?, ?)
-	`, reading.LotID, reading.City, reading.Timestamp, reading.Free, reading.State)
+		INSERT INTO parking_readings (lot_id, city, timestamp, timestamp_epoch, free, state)
+		VALUES (?, ?, ?, ?, ?, ?)
+	`, reading.LotID, reading.City, reading.Timestamp, reading.Timestamp.Unix(),
+		reading.Free, reading.State)
 
 	return err
 }